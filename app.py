@@ -5,12 +5,15 @@ import json
 import io
 from sentiment_analyzer import analyze_text, get_emoji_for_sentiment
 from data_processor import load_data, process_data
+from memory_manager import SessionHandle, SpilledFrameLostError, get_governor, format_bytes
 from data_visualizer import (
     create_sentiment_distribution_chart,
     create_sentiment_by_platform_chart,
     create_sentiment_wordcloud,
-    create_sentiment_over_time_chart
+    create_sentiment_over_time_chart,
+    create_top_entities_chart
 )
+from hashtag_analyzer import get_top_entities
 
 # Set page configuration
 st.set_page_config(
@@ -35,19 +38,58 @@ analysis_option = st.sidebar.radio(
     ["Upload Social Media Data", "Analyze Individual Post"]
 )
 
-# Initialize session state for storing data
-if 'data' not in st.session_state:
-    st.session_state.data = None
-if 'filtered_data' not in st.session_state:
-    st.session_state.filtered_data = None
+# Initialize session state for storing data.
+# Dataframes are held by the memory governor rather than directly in the
+# session state, so they can be spilled to disk when memory runs low.
+if 'frames' not in st.session_state:
+    st.session_state.frames = SessionHandle()
 if 'filter_applied' not in st.session_state:
     st.session_state.filter_applied = False
+if 'entity_sketches' not in st.session_state:
+    st.session_state.entity_sketches = {}
+if 'data_source' not in st.session_state:
+    st.session_state.data_source = None
+if 'applied_filters' not in st.session_state:
+    st.session_state.applied_filters = None
+if 'filter_mask' not in st.session_state:
+    st.session_state.filter_mask = None
+
+frames = st.session_state.frames
+# Release frames still pinned by a previous run that stopped early
+frames.end_run()
+
+def set_data(data, entity_sketches):
+    """Store a newly loaded dataset with its entity sketches and clear any previous filter."""
+    frames.store('data', data)
+    # Hashtag and mention sketches are small, so they live in the session state
+    st.session_state.entity_sketches = entity_sketches
+    reset_filters()
+
+def load_source(source_key, file_source):
+    """
+    Load and store a dataset, unless it is the one already loaded.
+    Streamlit reruns the script on every interaction, so the source key
+    keeps the dataset from being re-analyzed, re-sketched and re-stored each time.
+    """
+    if st.session_state.data_source != source_key:
+        entity_sketches = {}
+        data = load_data(file_source, entity_sketches)
+        set_data(data, entity_sketches)
+        st.session_state.data_source = source_key
+
+def get_filtered_data(data):
+    """Return the filtered rows of a dataset, or the dataset itself if no filter is applied."""
+    if st.session_state.filter_applied:
+        # The filter is kept as a row mask rather than a second copy of the data
+        return data[st.session_state.filter_mask]
+    return data
 
 # Function to reset filters
 def reset_filters():
-    st.session_state.filtered_data = st.session_state.data
+    st.session_state.filter_mask = None
     st.session_state.filter_applied = False
-    
+    st.session_state.applied_filters = None
+
 # Option 1: Upload Social Media Data
 if analysis_option == "Upload Social Media Data":
     st.subheader("Upload Social Media Data")
@@ -71,28 +113,33 @@ if analysis_option == "Upload Social Media Data":
         }
         
         try:
-            st.session_state.data = load_data(example_file_map[platform])
-            st.session_state.filtered_data = st.session_state.data
+            load_source(f"example:{platform}", example_file_map[platform])
             st.success(f"Loaded example {platform} dataset")
         except Exception as e:
             st.error(f"Error loading example data: {str(e)}")
     
     elif uploaded_file is not None:
         try:
-            st.session_state.data = load_data(uploaded_file)
-            st.session_state.filtered_data = st.session_state.data
+            load_source(f"upload:{uploaded_file.file_id}", uploaded_file)
             st.success("Data uploaded successfully!")
         except Exception as e:
             st.error(f"Error: {str(e)}")
     
     # Display data and visualizations if data is loaded
-    if st.session_state.data is not None:
+    try:
+        data = frames.get('data')
+    except SpilledFrameLostError as e:
+        data = None
+        st.session_state.data_source = None
+        reset_filters()
+        st.error(f"The loaded dataset is no longer available, please load it again. ({str(e)})")
+    if data is not None:
         # Filtering options
         st.subheader("Filter Data")
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            platforms = st.session_state.data['platform'].unique().tolist()
+            platforms = data['platform'].unique().tolist()
             selected_platforms = st.multiselect("Platform", platforms, default=platforms)
         
         with col2:
@@ -104,24 +151,30 @@ if analysis_option == "Upload Social Media Data":
             reset_button = st.button("Reset Filters")
         
         if filter_button:
-            st.session_state.filtered_data = st.session_state.data[
-                (st.session_state.data['platform'].isin(selected_platforms)) &
-                (st.session_state.data['sentiment'].isin(selected_sentiments))
-            ]
+            st.session_state.filter_mask = (
+                (data['platform'].isin(selected_platforms)) &
+                (data['sentiment'].isin(selected_sentiments))
+            ).to_numpy()
             st.session_state.filter_applied = True
+            # Kept so views built from sketches rather than rows can apply them
+            st.session_state.applied_filters = {
+                'platforms': list(selected_platforms),
+                'sentiments': list(selected_sentiments),
+            }
         
         if reset_button:
             reset_filters()
         
         # Display filtered data
-        if st.session_state.filtered_data is not None:
+        filtered_data = get_filtered_data(data)
+        if filtered_data is not None:
             if st.session_state.filter_applied:
-                st.write(f"Showing filtered data: {len(st.session_state.filtered_data)} records")
+                st.write(f"Showing filtered data: {len(filtered_data)} records")
             else:
-                st.write(f"Showing all data: {len(st.session_state.filtered_data)} records")
+                st.write(f"Showing all data: {len(filtered_data)} records")
             
             with st.expander("Show Data Table"):
-                st.dataframe(st.session_state.filtered_data)
+                st.dataframe(filtered_data)
             
             # Display visualizations
             st.subheader("Sentiment Analysis Results")
@@ -130,7 +183,7 @@ if analysis_option == "Upload Social Media Data":
             metric_col1, metric_col2, metric_col3 = st.columns(3)
             
             with metric_col1:
-                sentiment_counts = st.session_state.filtered_data['sentiment'].value_counts(normalize=True) * 100
+                sentiment_counts = filtered_data['sentiment'].value_counts(normalize=True) * 100
                 positive_pct = sentiment_counts.get('positive', 0)
                 st.metric("Positive Sentiment", f"{positive_pct:.1f}%")
             
@@ -143,29 +196,74 @@ if analysis_option == "Upload Social Media Data":
                 st.metric("Negative Sentiment", f"{negative_pct:.1f}%")
             
             # Visualizations in tabs
-            tab1, tab2, tab3, tab4 = st.tabs(["Distribution", "By Platform", "Over Time", "Word Cloud"])
+            tab1, tab2, tab3, tab4, tab5 = st.tabs(["Distribution", "By Platform", "Over Time", "Word Cloud", "Top Hashtags"])
             
             with tab1:
-                dist_chart = create_sentiment_distribution_chart(st.session_state.filtered_data)
+                dist_chart = create_sentiment_distribution_chart(filtered_data)
                 st.plotly_chart(dist_chart, use_container_width=True)
             
             with tab2:
-                platform_chart = create_sentiment_by_platform_chart(st.session_state.filtered_data)
+                platform_chart = create_sentiment_by_platform_chart(filtered_data)
                 st.plotly_chart(platform_chart, use_container_width=True)
             
             with tab3:
-                if 'date' in st.session_state.filtered_data.columns:
-                    time_chart = create_sentiment_over_time_chart(st.session_state.filtered_data)
+                if 'date' in filtered_data.columns:
+                    time_chart = create_sentiment_over_time_chart(filtered_data)
                     st.plotly_chart(time_chart, use_container_width=True)
                 else:
                     st.info("Time-based analysis not available for this dataset. Date information is missing.")
             
             with tab4:
-                wordcloud = create_sentiment_wordcloud(st.session_state.filtered_data)
+                wordcloud = create_sentiment_wordcloud(filtered_data)
                 if wordcloud:
                     st.image(wordcloud)
                 else:
                     st.info("Word cloud generation requires more text data.")
+            
+            with tab5:
+                sketches = st.session_state.entity_sketches
+                
+                # Sketches cover the full dataset, so narrow them to the applied filters
+                sketch_sentiments = ['positive', 'neutral', 'negative']
+                sketch_platforms = sorted({platform for _, platform in sketches})
+                if st.session_state.filter_applied and st.session_state.applied_filters:
+                    applied = st.session_state.applied_filters
+                    sketch_sentiments = [s for s in sketch_sentiments if s in applied['sentiments']]
+                    sketch_platforms = [p for p in sketch_platforms if p in applied['platforms']]
+                
+                sketch_col1, sketch_col2, sketch_col3 = st.columns(3)
+                
+                with sketch_col1:
+                    sketch_sentiment = st.selectbox("Sentiment", ["All"] + sketch_sentiments, key="sketch_sentiment")
+                
+                with sketch_col2:
+                    sketch_platform = st.selectbox("Platform", ["All"] + sketch_platforms, key="sketch_platform")
+                
+                with sketch_col3:
+                    top_n = st.slider("Number of terms", 5, 50, 10, key="sketch_top_n")
+                
+                sentiment_filter = sketch_sentiments if sketch_sentiment == "All" else [sketch_sentiment]
+                platform_filter = sketch_platforms if sketch_platform == "All" else [sketch_platform]
+                
+                hashtag_col, mention_col = st.columns(2)
+                
+                with hashtag_col:
+                    top_hashtags = get_top_entities(sketches, 'hashtags', sentiment_filter, platform_filter, top_n)
+                    hashtag_chart = create_top_entities_chart(top_hashtags, 'Top Hashtags')
+                    if hashtag_chart:
+                        st.plotly_chart(hashtag_chart, use_container_width=True)
+                    else:
+                        st.info("No hashtags found for this selection.")
+                
+                with mention_col:
+                    top_mentions = get_top_entities(sketches, 'mentions', sentiment_filter, platform_filter, top_n)
+                    mention_chart = create_top_entities_chart(top_mentions, 'Top Mentions')
+                    if mention_chart:
+                        st.plotly_chart(mention_chart, use_container_width=True)
+                    else:
+                        st.info("No mentions found for this selection.")
+                
+                st.caption("Counts are estimated with bounded-memory Space-Saving sketches and may overcount rare terms.")
 
 # Option 2: Analyze Individual Post
 else:
@@ -252,6 +350,21 @@ else:
                 else:
                     st.markdown("This post expresses a negative sentiment, suggesting disapproval, criticism, or dissatisfaction.")
 
+# Frames used by this run may now be spilled if they are over budget
+frames.end_run()
+
+# Memory usage monitoring
+with st.sidebar.expander("Memory Usage"):
+    session_usage = frames.usage()
+    global_usage = get_governor().get_usage()
+    st.write(f"This session: {format_bytes(session_usage['resident_bytes'])} in memory, "
+             f"{format_bytes(session_usage['spilled_bytes'])} on disk "
+             f"(budget {format_bytes(global_usage['session_budget'])})")
+    st.write(f"All sessions: {format_bytes(global_usage['resident_bytes'])} in memory, "
+             f"{format_bytes(global_usage['spilled_bytes'])} on disk "
+             f"(budget {format_bytes(global_usage['global_budget'])})")
+    st.write(f"Active sessions: {len(global_usage['sessions'])}")
+
 # Footer
 st.markdown("---")
 st.markdown("Social Media Sentiment Analysis Tool | Made with Streamlit")
@@ -5,10 +5,12 @@ import datetime
 import re
 from sentiment_analyzer import analyze_dataframe
 
-def load_data(file_source):
+def load_data(file_source, entity_sketches=None):
     """
     Load data from a file source (path or uploaded file).
     Supports CSV and JSON formats.
+    If an entity_sketches dict is given, it is filled with hashtag and
+    mention sketches (see analyze_dataframe).
     """
     if isinstance(file_source, str):  # File path
         if file_source.endswith('.csv'):
@@ -29,9 +31,9 @@ def load_data(file_source):
             raise ValueError("Unsupported file format. Please upload a CSV or JSON file.")
     
     # Process the data
-    return process_data(data)
+    return process_data(data, entity_sketches)
 
-def process_data(data):
+def process_data(data, entity_sketches=None):
     """
     Process and validate the input data.
     Ensures required columns exist and adds sentiment analysis.
@@ -73,7 +75,7 @@ def process_data(data):
         data['date'] = datetime.datetime.now()
     
     # Add sentiment analysis
-    data = analyze_dataframe(data, text_column)
+    data = analyze_dataframe(data, text_column, entity_sketches)
     
     return data
 
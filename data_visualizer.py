@@ -190,3 +190,29 @@ def create_sentiment_wordcloud(data, max_words=100):
     except Exception as e:
         print(f"Error generating word cloud: {str(e)}")
         return None
+
+def create_top_entities_chart(top_entities, title='Top Hashtags'):
+    """
+    Create a horizontal bar chart of the most frequent hashtags or mentions.
+    Expects a dataframe with 'Term' and 'Count' columns, ordered by count.
+    """
+    if top_entities is None or top_entities.empty:
+        return None
+    
+    fig = px.bar(
+        top_entities,
+        x='Count',
+        y='Term',
+        orientation='h',
+        title=title,
+        labels={'Count': 'Estimated Occurrences', 'Term': ''},
+        text='Count'
+    )
+    
+    fig.update_traces(marker_color='#1E88E5', textposition='outside')
+    fig.update_layout(
+        xaxis_title='Estimated Occurrences',
+        yaxis={'categoryorder': 'total ascending'}
+    )
+    
+    return fig
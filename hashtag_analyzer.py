@@ -0,0 +1,241 @@
+import heapq
+from collections import Counter
+from itertools import compress, islice
+
+import pandas as pd
+
+# Number of counters kept per sketch; items outside the top few hundred
+# are rarely interesting and not worth the memory
+DEFAULT_CAPACITY = 200
+
+# Posts whose hashtags and mentions are held at once before being reduced
+# to sketches while a dataframe is analyzed
+DEFAULT_CHUNK_SIZE = 10000
+
+# Items counted exactly at a time by SpaceSavingSketch.update before being
+# reduced to a summary and merged into the sketch
+DEFAULT_BATCH_SIZE = 10000
+
+ENTITY_COLUMNS = ['hashtags', 'mentions']
+
+
+class SpaceSavingSketch:
+    """
+    Bounded-memory heavy-hitter sketch using the Space-Saving algorithm.
+
+    Keeps at most `capacity` counters. Each reported count overestimates the
+    true count by at most its error, and any item with a true frequency above
+    total / capacity is guaranteed to be tracked. Sketches built over separate
+    chunks or workers can be combined with merge().
+
+    The smallest counter is found through a min-heap with lazy invalidation:
+    incrementing a counter pushes a new heap entry, and outdated entries are
+    skipped when they reach the top.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        if capacity < 1:
+            raise ValueError("Sketch capacity must be at least 1.")
+        self.capacity = capacity
+        self.total = 0
+        self.counts = {}
+        self.errors = {}
+        self._heap = []  # (count, item) entries, possibly outdated
+        # Upper bound on the count of any item that is not tracked
+        self._untracked_max = 0
+
+    def add(self, item, count=1):
+        """Record `count` occurrences of an item."""
+        self.total += count
+        if item in self.counts:
+            new_count = self.counts[item] + count
+            self.counts[item] = new_count
+            self._push(new_count, item)
+            return
+
+        if len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+            self._push(count, item)
+            return
+
+        # Replace the smallest counter; its count becomes the new item's error
+        min_count, min_item = self._pop_min()
+        del self.counts[min_item]
+        del self.errors[min_item]
+        self._untracked_max = max(self._untracked_max, min_count)
+        self.counts[item] = min_count + count
+        self.errors[item] = min_count
+        self._push(min_count + count, item)
+
+    def update(self, items, batch_size=DEFAULT_BATCH_SIZE):
+        """
+        Record one occurrence of each item in an iterable.
+        Items are counted exactly in batches of at most `batch_size`, and each
+        batch is reduced to its top `capacity` items before being merged in,
+        so memory stays bounded by the batch size.
+        """
+        items = iter(items)
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                break
+            self.total += len(batch)
+            self._add_batch(Counter(batch))
+
+    def merge(self, other):
+        """
+        Return a new sketch combining this sketch with another.
+        Items missing from a sketch are assumed to have that sketch's largest
+        possible untracked count, which keeps the error bounds valid after
+        merging.
+        """
+        merged = SpaceSavingSketch(max(self.capacity, other.capacity))
+        merged.total = self.total + other.total
+        merged._set_counters(*_combine_counters(
+            (self.counts, self.errors, self._floor()),
+            (other.counts, other.errors, other._floor()),
+            merged.capacity,
+        ))
+        return merged
+
+    def top(self, n=10):
+        """Return the n items with the highest estimated counts as (item, count, error) tuples."""
+        top_items = sorted(self.counts, key=lambda item: (-self.counts[item], item))[:n]
+        return [(item, self.counts[item], self.errors[item]) for item in top_items]
+
+    def _add_batch(self, batch_counts):
+        """Merge exact counts for a batch of items into the sketch; the caller updates total."""
+        # Reduce the batch to a summary of at most `capacity` exact counters;
+        # every item left out occurs at most `batch_floor` times
+        batch_floor = 0
+        if len(batch_counts) > self.capacity:
+            batch_floor = sorted(batch_counts.values(), reverse=True)[self.capacity]
+            # compress() keeps the filtering over the whole batch in C
+            kept = list(compress(batch_counts.keys(), map(batch_floor.__lt__, batch_counts.values())))
+            ties = compress(batch_counts.keys(), map(batch_floor.__eq__, batch_counts.values()))
+            kept.extend(islice(ties, self.capacity - len(kept)))
+            batch_counts = {item: batch_counts[item] for item in kept}
+
+        self._set_counters(*_combine_counters(
+            (self.counts, self.errors, self._floor()),
+            (batch_counts, dict.fromkeys(batch_counts, 0), batch_floor),
+            self.capacity,
+        ))
+
+    def _set_counters(self, counts, errors, untracked_max):
+        self.counts = counts
+        self.errors = errors
+        self._untracked_max = untracked_max
+        self._heap = [(count, item) for item, count in counts.items()]
+        heapq.heapify(self._heap)
+
+    def _push(self, count, item):
+        heapq.heappush(self._heap, (count, item))
+        # Rebuild once outdated entries dominate, keeping the heap bounded
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [(c, i) for i, c in self.counts.items()]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self):
+        """Remove and return the smallest current (count, item) heap entry."""
+        while True:
+            count, item = heapq.heappop(self._heap)
+            if self.counts.get(item) == count:
+                return count, item
+
+    def _floor(self):
+        """Largest count an untracked item could have."""
+        if len(self.counts) < self.capacity:
+            return self._untracked_max
+        return max(self._untracked_max, min(self.counts.values()))
+
+
+def _combine_counters(left, right, capacity):
+    """
+    Combine two (counts, errors, floor) summaries, keeping the top `capacity`
+    items. Returns the combined counts, errors and floor.
+    """
+    left_counts, left_errors, left_floor = left
+    right_counts, right_errors, right_floor = right
+
+    counts = {}
+    errors = {}
+    for item in left_counts.keys() | right_counts.keys():
+        counts[item] = left_counts.get(item, left_floor) + right_counts.get(item, right_floor)
+        errors[item] = left_errors.get(item, left_floor) + right_errors.get(item, right_floor)
+
+    floor = left_floor + right_floor
+    if len(counts) > capacity:
+        ranked = sorted(counts, key=counts.get, reverse=True)
+        floor = max(floor, counts[ranked[capacity]])
+        ranked = ranked[:capacity]
+        counts = {item: counts[item] for item in ranked}
+        errors = {item: errors[item] for item in ranked}
+    return counts, errors, floor
+
+
+def build_entity_sketches(records, capacity=DEFAULT_CAPACITY):
+    """
+    Build hashtag and mention sketches for one chunk of posts.
+    `records` is an iterable of (sentiment, platform, hashtags, mentions)
+    tuples. Returns a dict keyed by (sentiment, platform), each value a dict
+    of sketches keyed by 'hashtags' and 'mentions'. Sketches for separate
+    chunks or workers are combined with merge_entity_sketches.
+    """
+    grouped = {}
+    for sentiment, platform, hashtags, mentions in records:
+        entities = grouped.setdefault((sentiment, platform), ([], []))
+        entities[0].extend(hashtags)
+        entities[1].extend(mentions)
+
+    sketches = {}
+    for key, entity_lists in grouped.items():
+        sketches[key] = {}
+        for col, items in zip(ENTITY_COLUMNS, entity_lists):
+            sketch = SpaceSavingSketch(capacity)
+            sketch.update(items)
+            sketches[key][col] = sketch
+    return sketches
+
+
+def merge_entity_sketches(left, right):
+    """Merge two sketch dicts as returned by build_entity_sketches."""
+    merged = dict(left)
+    for key, entity_sketches in right.items():
+        if key not in merged:
+            merged[key] = entity_sketches
+        else:
+            merged[key] = {
+                col: merged[key][col].merge(entity_sketches[col])
+                for col in ENTITY_COLUMNS
+            }
+    return merged
+
+
+def get_top_entities(sketches, entity='hashtags', sentiments=None, platforms=None, n=10):
+    """
+    Return the top hashtags or mentions as a dataframe.
+    Sketches for the selected sentiments and platforms (all if None) are
+    merged before querying. Columns: 'Term', 'Count', 'Error'.
+    """
+    if entity not in ENTITY_COLUMNS:
+        raise ValueError(f"Unknown entity type '{entity}'. Expected one of {ENTITY_COLUMNS}.")
+
+    combined = None
+    for (sentiment, platform), entity_sketches in sketches.items():
+        if sentiments is not None and sentiment not in sentiments:
+            continue
+        if platforms is not None and platform not in platforms:
+            continue
+        sketch = entity_sketches[entity]
+        combined = sketch if combined is None else combined.merge(sketch)
+
+    if combined is None:
+        return pd.DataFrame(columns=['Term', 'Count', 'Error'])
+
+    prefix = '#' if entity == 'hashtags' else '@'
+    return pd.DataFrame(
+        [(prefix + item, count, error) for item, count, error in combined.top(n)],
+        columns=['Term', 'Count', 'Error']
+    )
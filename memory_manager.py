@@ -0,0 +1,403 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+import weakref
+from collections import OrderedDict
+
+import pandas as pd
+
+
+def budget_from_env(name, default):
+    """
+    Read a memory budget in bytes from an environment variable.
+    Falls back to the default if the variable is unset or not a positive integer.
+    """
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    try:
+        budget = int(value)
+    except ValueError:
+        budget = 0
+    if budget <= 0:
+        print(f"Ignoring invalid {name}={value!r}; expected a positive number of bytes. "
+              f"Using the default of {default} bytes.")
+        return default
+    return budget
+
+
+# Default memory budgets (in bytes), overridable through environment variables
+DEFAULT_SESSION_BUDGET = budget_from_env("SENTIMENT_SESSION_MEMORY_BUDGET", 256 * 1024 * 1024)
+DEFAULT_GLOBAL_BUDGET = budget_from_env("SENTIMENT_GLOBAL_MEMORY_BUDGET", 1024 * 1024 * 1024)
+
+
+class SpilledFrameLostError(LookupError):
+    """Raised when a spilled frame can no longer be read back from disk."""
+
+
+def estimate_frame_size(frame):
+    """Return the approximate in-memory size of a dataframe in bytes."""
+    if frame is None:
+        return 0
+    return int(frame.memory_usage(index=True, deep=True).sum())
+
+
+class _FrameEntry:
+    """Bookkeeping for a single dataframe held on behalf of a session."""
+
+    def __init__(self, frame, size):
+        self.frame = frame
+        self.size = size
+        self.spill_path = None
+        # Frame whose spill file is still being written, so it can be served
+        # from memory until the write finishes
+        self.writing_frame = None
+        # Set while a reload from disk is in progress; other readers wait on it
+        self.loading = None
+        # Number of disk reads/writes in flight; the spill file is only
+        # removed once they have finished
+        self.io_pending = 0
+        self.dropped = False
+
+    @property
+    def resident(self):
+        return self.frame is not None
+
+
+class MemoryGovernor:
+    """
+    Track dataframes held by user sessions and keep them within memory budgets.
+
+    Frames are keyed by (session_id, name). When a session or the whole process
+    goes over budget, the least-recently-used frames are spilled to compressed
+    pickle files on disk and reloaded transparently on the next access.
+    Stored frames are treated as immutable, so a spill file is written once and
+    reused until the frame is replaced or released.
+
+    Frames a session stores or reads are pinned until unpin_session() is
+    called at the end of its script run. The caller holds references to them
+    for the rest of the run, so spilling them would free nothing; budgets are
+    enforced over unpinned frames, and again once the pins are released.
+
+    Disk reads and writes happen outside the governor's lock, so a session
+    spilling or reloading a large frame does not block other sessions.
+    """
+
+    def __init__(self, session_budget=DEFAULT_SESSION_BUDGET,
+                 global_budget=DEFAULT_GLOBAL_BUDGET, spill_dir=None):
+        self.session_budget = session_budget
+        self.global_budget = global_budget
+        self.spill_dir = spill_dir or tempfile.mkdtemp(prefix="sentiment_spill_")
+        os.makedirs(self.spill_dir, exist_ok=True)
+        self._entries = OrderedDict()  # (session_id, name) -> _FrameEntry, LRU first
+        self._pinned = set()  # keys in use by their session's current run
+        self._lock = threading.RLock()
+        self._spill_count = 0
+        self._reload_count = 0
+
+    def store(self, session_id, name, frame):
+        """Store a frame for a session, replacing any previous frame of that name."""
+        key = (session_id, name)
+        size = estimate_frame_size(frame)
+        with self._lock:
+            self._drop(key)
+            if frame is None:
+                return
+            self._entries[key] = _FrameEntry(frame, size)
+            self._pinned.add(key)
+            pending_writes = self._enforce_budgets(session_id)
+        self._write_spills(pending_writes)
+
+    def get(self, session_id, name):
+        """Return a stored frame, reloading it from disk if it was spilled."""
+        key = (session_id, name)
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    return None
+
+                # A spill that is still being written can be undone for free
+                if entry.frame is None and entry.writing_frame is not None:
+                    entry.frame = entry.writing_frame
+
+                if entry.frame is not None:
+                    frame = entry.frame
+                    pending_writes = self._touch(key, entry)
+                    break
+
+                load_event = entry.loading
+                if load_event is None:
+                    entry.loading = threading.Event()
+                    entry.io_pending += 1
+                    spill_path = entry.spill_path
+
+            if load_event is not None:
+                # Another session is already reloading this frame
+                load_event.wait()
+                continue
+
+            frame, pending_writes = self._load(key, entry, spill_path)
+            break
+
+        self._write_spills(pending_writes)
+        return frame
+
+    def unpin_session(self, session_id):
+        """
+        Release the frames a session used during its current run and spill
+        any that no longer fit the budgets.
+        """
+        with self._lock:
+            self._pinned = {key for key in self._pinned if key[0] != session_id}
+            pending_writes = self._enforce_budgets(session_id)
+        self._write_spills(pending_writes)
+
+    def release(self, session_id, name):
+        """Forget a single frame held by a session."""
+        with self._lock:
+            self._drop((session_id, name))
+
+    def release_session(self, session_id):
+        """Forget every frame held by a session and remove its spill files."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == session_id]:
+                self._drop(key)
+
+    def get_usage(self):
+        """
+        Return a snapshot of current memory usage for monitoring.
+        Sizes are approximate and reported in bytes.
+        """
+        with self._lock:
+            sessions = {}
+            for (session_id, _), entry in self._entries.items():
+                stats = sessions.setdefault(session_id, {
+                    "resident_bytes": 0,
+                    "spilled_bytes": 0,
+                    "frames": 0,
+                })
+                stats["frames"] += 1
+                if entry.resident:
+                    stats["resident_bytes"] += entry.size
+                else:
+                    stats["spilled_bytes"] += entry.size
+
+            return {
+                "resident_bytes": self._resident_bytes(),
+                "spilled_bytes": sum(s["spilled_bytes"] for s in sessions.values()),
+                "session_budget": self.session_budget,
+                "global_budget": self.global_budget,
+                "spill_count": self._spill_count,
+                "reload_count": self._reload_count,
+                "sessions": sessions,
+            }
+
+    def get_session_usage(self, session_id):
+        """Return the usage snapshot for a single session."""
+        return self.get_usage()["sessions"].get(session_id, {
+            "resident_bytes": 0,
+            "spilled_bytes": 0,
+            "frames": 0,
+        })
+
+    def _resident_bytes(self, session_id=None):
+        return sum(
+            entry.size for key, entry in self._entries.items()
+            if entry.resident and (session_id is None or key[0] == session_id)
+        )
+
+    def _load(self, key, entry, spill_path):
+        """
+        Reload a spilled frame from disk without holding the lock.
+        If the spill file is missing or unreadable (for example removed by a
+        temp file cleaner), the entry is dropped and SpilledFrameLostError raised.
+        """
+        frame = None
+        error = None
+        try:
+            frame = pd.read_pickle(spill_path, compression="gzip")
+        except Exception as e:
+            error = e
+
+        with self._lock:
+            load_event = entry.loading
+            entry.loading = None
+            entry.io_pending -= 1
+            pending_writes = []
+            if error is not None:
+                if self._entries.get(key) is entry:
+                    self._drop(key)
+            elif not entry.dropped:
+                entry.frame = frame
+                self._reload_count += 1
+                pending_writes = self._touch(key, entry)
+            self._finish_io(entry)
+        load_event.set()
+
+        if error is not None:
+            raise SpilledFrameLostError(
+                f"Spilled data for '{key[1]}' could not be read back from disk: {str(error)}"
+            ) from error
+        return frame, pending_writes
+
+    def _touch(self, key, entry):
+        """Pin a resident frame, mark it most recently used and rebalance. Call with the lock held."""
+        self._entries.move_to_end(key)
+        self._pinned.add(key)
+        return self._enforce_budgets(key[0])
+
+    def _enforce_budgets(self, session_id):
+        """
+        Spill least-recently-used unpinned frames until both budgets are
+        respected, or until only pinned frames are left. Call with the lock
+        held. Returns the entries whose spill files still need to be written
+        with _write_spills once the lock is released.
+        """
+        pending_writes = []
+
+        # Per-session budget: only this session's frames are candidates
+        self._spill_until(
+            lambda: self._resident_bytes(session_id) > self.session_budget,
+            lambda key: key[0] == session_id,
+            pending_writes,
+        )
+
+        # Global budget: any session's frames are candidates
+        self._spill_until(
+            lambda: self._resident_bytes() > self.global_budget,
+            lambda key: True,
+            pending_writes,
+        )
+        return pending_writes
+
+    def _spill_until(self, over_budget, candidate, pending_writes):
+        if not over_budget():
+            return
+        for key, entry in list(self._entries.items()):
+            if key not in self._pinned and entry.resident and candidate(key):
+                self._spill(entry, pending_writes)
+                if not over_budget():
+                    return
+
+    def _spill(self, entry, pending_writes):
+        """
+        Evict a frame from memory. Frames that already have a spill file are
+        evicted immediately; otherwise the write is queued in pending_writes.
+        """
+        if entry.spill_path is None:
+            entry.spill_path = os.path.join(self.spill_dir, f"{uuid.uuid4().hex}.pkl.gz")
+            entry.writing_frame = entry.frame
+            entry.io_pending += 1
+            pending_writes.append(entry)
+        entry.frame = None
+        self._spill_count += 1
+
+    def _write_spills(self, pending_writes):
+        """Write queued spill files without holding the lock."""
+        for entry in pending_writes:
+            frame = entry.writing_frame
+            try:
+                frame.to_pickle(entry.spill_path, compression="gzip")
+                failed = False
+            except Exception as e:
+                print(f"Error spilling dataframe to disk: {str(e)}")
+                failed = True
+
+            with self._lock:
+                entry.writing_frame = None
+                entry.io_pending -= 1
+                if failed:
+                    # Keep the frame in memory rather than lose it
+                    self._remove_spill_file(entry)
+                    entry.spill_path = None
+                    if entry.frame is None:
+                        entry.frame = frame
+                self._finish_io(entry)
+
+    def _finish_io(self, entry):
+        """Remove the spill file of a dropped entry once its I/O has finished."""
+        if entry.dropped and entry.io_pending == 0:
+            self._remove_spill_file(entry)
+
+    def _drop(self, key):
+        self._pinned.discard(key)
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        entry.dropped = True
+        entry.frame = None
+        self._finish_io(entry)
+
+    @staticmethod
+    def _remove_spill_file(entry):
+        if entry.spill_path:
+            try:
+                os.remove(entry.spill_path)
+            except OSError:
+                pass
+
+    def cleanup(self):
+        """Drop all frames and remove the spill directory."""
+        with self._lock:
+            self._entries.clear()
+            self._pinned.clear()
+            shutil.rmtree(self.spill_dir, ignore_errors=True)
+
+
+class SessionHandle:
+    """
+    Per-session accessor for the shared governor.
+    Keep one instance in the session state; when the session ends and the
+    handle is garbage collected, all frames it held are released.
+    """
+
+    def __init__(self, governor=None):
+        self.governor = governor or get_governor()
+        self.session_id = uuid.uuid4().hex
+        weakref.finalize(self, self.governor.release_session, self.session_id)
+
+    def store(self, name, frame):
+        self.governor.store(self.session_id, name, frame)
+
+    def end_run(self):
+        """Release the frames used during this script run; see MemoryGovernor.unpin_session."""
+        self.governor.unpin_session(self.session_id)
+
+    def get(self, name):
+        return self.governor.get(self.session_id, name)
+
+    def release(self, name):
+        self.governor.release(self.session_id, name)
+
+    def usage(self):
+        return self.governor.get_session_usage(self.session_id)
+
+
+_governor = None
+_governor_lock = threading.Lock()
+
+
+def get_governor():
+    """
+    Return the process-wide memory governor shared by all sessions.
+    Its spill directory is removed when the process exits.
+    """
+    global _governor
+    with _governor_lock:
+        if _governor is None:
+            _governor = MemoryGovernor()
+            atexit.register(_governor.cleanup)
+        return _governor
+
+
+def format_bytes(num_bytes):
+    """Format a byte count as a human readable string."""
+    for unit in ["B", "KB", "MB", "GB"]:
+        if abs(num_bytes) < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} TB"
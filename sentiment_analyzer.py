@@ -3,6 +3,7 @@ from nltk.sentiment.vader import SentimentIntensityAnalyzer
 import pandas as pd
 from textblob import TextBlob
 import re
+from hashtag_analyzer import DEFAULT_CHUNK_SIZE, build_entity_sketches, merge_entity_sketches
 
 # Download required NLTK data
 try:
@@ -18,17 +19,42 @@ except LookupError:
 # Initialize sentiment analyzer
 sia = SentimentIntensityAnalyzer()
 
+# Patterns used when cleaning text
+URL_PATTERN = re.compile(r'http\S+|www\S+|https\S+', flags=re.MULTILINE)
+# Markers must not follow a word character, so 'a@b.com' and 'issue#123'
+# are not taken as a mention or hashtag
+MENTION_PATTERN = re.compile(r'(?<!\w)@(\w+)')
+HASHTAG_PATTERN = re.compile(r'(?<!\w)#(\w+)')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
 def analyze_text(text):
     """
     Analyze sentiment of a text using both VADER and TextBlob.
     Returns sentiment category, component scores, and compound score.
     """
+    sentiment, component_scores, compound_score, _, _ = analyze_text_with_entities(text)
+    return sentiment, component_scores, compound_score
+
+def analyze_text_with_entities(text):
+    """
+    Analyze sentiment of a text and collect its hashtags and mentions.
+    Returns sentiment category, component scores, compound score,
+    hashtags, and mentions.
+    """
     if not text or text.strip() == "":
-        return "neutral", (0.0, 0.0, 0.0), 0.0
+        return "neutral", (0.0, 0.0, 0.0), 0.0, [], []
     
-    # Clean text
-    cleaned_text = clean_text(text)
+    # Clean text, collecting hashtags and mentions in the same pass
+    cleaned_text, hashtags, mentions = clean_text_with_entities(text)
     
+    sentiment, component_scores, compound_score = score_cleaned_text(cleaned_text)
+    return sentiment, component_scores, compound_score, hashtags, mentions
+
+def score_cleaned_text(cleaned_text):
+    """
+    Score text that has already been passed through clean_text.
+    Returns sentiment category, component scores, and compound score.
+    """
     # Get VADER sentiment scores
     vader_scores = sia.polarity_scores(cleaned_text)
     
@@ -54,37 +80,73 @@ def analyze_text(text):
 
 def clean_text(text):
     """Clean and preprocess text for sentiment analysis."""
+    return clean_text_with_entities(text)[0]
+
+def clean_text_with_entities(text):
+    """
+    Clean text for sentiment analysis and collect its hashtags and mentions.
+    Returns the cleaned text, a list of hashtags and a list of mentions.
+    Hashtags and mentions are lowercased and returned without their markers.
+    """
     # Convert to string if not already
     text = str(text)
     
     # Remove URLs
-    text = re.sub(r'http\S+|www\S+|https\S+', '', text, flags=re.MULTILINE)
+    text = URL_PATTERN.sub('', text)
+    
+    # Remove user mentions (for Twitter), collecting them as they are replaced
+    mentions = []
+    
+    def remove_mention(match):
+        mentions.append(match.group(1).lower())
+        return ''
+    
+    text = MENTION_PATTERN.sub(remove_mention, text)
     
-    # Remove user mentions (for Twitter)
-    text = re.sub(r'@\w+', '', text)
+    # Remove hashtag symbol but keep the text, collecting hashtags the same way
+    hashtags = []
     
-    # Remove hashtag symbol but keep the text
-    text = re.sub(r'#(\w+)', r'\1', text)
+    def strip_hashtag(match):
+        hashtags.append(match.group(1).lower())
+        return match.group(1)
+    
+    text = HASHTAG_PATTERN.sub(strip_hashtag, text)
     
     # Remove extra whitespace
-    text = re.sub(r'\s+', ' ', text).strip()
+    text = WHITESPACE_PATTERN.sub(' ', text).strip()
     
-    return text
+    return text, hashtags, mentions
 
-def analyze_dataframe(df, text_column):
+def analyze_dataframe(df, text_column, entity_sketches=None):
     """
     Add sentiment analysis results to a dataframe.
     Adds 'sentiment', 'sentiment_score', and 'sentiment_components' columns.
+    
+    If an entity_sketches dict is given, hashtag and mention sketches keyed by
+    (sentiment, platform) are merged into it. Entities are only held for one
+    chunk of rows at a time, so they are not kept per row in the dataframe.
     """
     # Ensure we have the text column
     if text_column not in df.columns:
         raise ValueError(f"Text column '{text_column}' not found in dataframe")
     
+    platforms = df['platform'] if 'platform' in df.columns else ["unknown"] * len(df)
+    
     # Apply sentiment analysis to each row
     results = []
-    for text in df[text_column]:
-        sentiment, components, score = analyze_text(text)
+    chunk_entities = []
+    for text, platform in zip(df[text_column], platforms):
+        sentiment, components, score, hashtags, mentions = analyze_text_with_entities(text)
         results.append((sentiment, score, components))
+        
+        if entity_sketches is not None:
+            chunk_entities.append((sentiment, platform, hashtags, mentions))
+            if len(chunk_entities) >= DEFAULT_CHUNK_SIZE:
+                _merge_chunk_sketches(entity_sketches, chunk_entities)
+                chunk_entities = []
+    
+    if chunk_entities:
+        _merge_chunk_sketches(entity_sketches, chunk_entities)
     
     # Add results to dataframe
     df['sentiment'] = [r[0] for r in results]
@@ -93,6 +155,11 @@ def analyze_dataframe(df, text_column):
     
     return df
 
+def _merge_chunk_sketches(entity_sketches, chunk_entities):
+    """Reduce one chunk of entities to sketches and merge them in place."""
+    chunk_sketches = build_entity_sketches(chunk_entities)
+    entity_sketches.update(merge_entity_sketches(entity_sketches, chunk_sketches))
+
 def get_emoji_for_sentiment(sentiment):
     """Return an appropriate emoji for a sentiment category."""
     if sentiment == "positive":
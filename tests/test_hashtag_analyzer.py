@@ -0,0 +1,222 @@
+import heapq
+import random
+import time
+from collections import Counter
+
+import pytest
+
+import hashtag_analyzer
+from hashtag_analyzer import (
+    SpaceSavingSketch,
+    build_entity_sketches,
+    get_top_entities,
+    merge_entity_sketches,
+)
+
+
+def make_stream(size=50000, seed=0):
+    """Skewed stream of a few heavy hitters mixed with many rare tags."""
+    rng = random.Random(seed)
+    heavy = [f"heavy{int(rng.paretovariate(1.1))}" for _ in range(size // 2)]
+    rare = [f"rare{rng.randrange(10 ** 7)}" for _ in range(size - size // 2)]
+    stream = heavy + rare
+    rng.shuffle(stream)
+    return stream
+
+
+def add_all(sketch, stream):
+    for item in stream:
+        sketch.add(item)
+    return sketch
+
+
+def merge_parts(stream, parts=5, capacity=50):
+    sketches = [SpaceSavingSketch(capacity) for _ in range(parts)]
+    for i, item in enumerate(stream):
+        sketches[i % parts].add(item)
+    merged = sketches[0]
+    for sketch in sketches[1:]:
+        merged = merged.merge(sketch)
+    return merged
+
+
+def best_time(func, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.fixture(params=['add', 'update', 'merge'])
+def built_sketch(request):
+    stream = make_stream()
+    if request.param == 'add':
+        sketch = add_all(SpaceSavingSketch(50), stream)
+    elif request.param == 'update':
+        sketch = SpaceSavingSketch(50)
+        sketch.update(stream, batch_size=3000)
+    else:
+        sketch = merge_parts(stream)
+    return sketch, Counter(stream)
+
+
+def test_counts_respect_error_bounds(built_sketch):
+    sketch, exact = built_sketch
+    assert sketch.total == sum(exact.values())
+    assert len(sketch.counts) <= sketch.capacity
+    for item, count in sketch.counts.items():
+        assert count - sketch.errors[item] <= exact[item] <= count
+
+
+def test_untracked_items_bounded_by_floor(built_sketch):
+    sketch, exact = built_sketch
+    untracked = [count for item, count in exact.items() if item not in sketch.counts]
+    assert max(untracked) <= sketch._floor()
+
+
+def test_heavy_hitters_are_tracked(built_sketch):
+    sketch, exact = built_sketch
+    threshold = sketch.total / sketch.capacity
+    for item, count in exact.items():
+        if count > threshold:
+            assert item in sketch.counts
+    assert [item for item, _, _ in sketch.top(3)] == [item for item, _ in exact.most_common(3)]
+
+
+def test_small_stream_is_counted_exactly():
+    sketch = SpaceSavingSketch(10)
+    sketch.update(['a', 'b', 'a', 'c', 'a', 'b'])
+    assert sketch.top(3) == [('a', 3, 0), ('b', 2, 0), ('c', 1, 0)]
+
+
+def test_merge_with_empty_sketch_keeps_counts():
+    sketch = add_all(SpaceSavingSketch(3), ['a', 'a', 'b', 'c', 'd'])
+    merged = sketch.merge(SpaceSavingSketch(3))
+    assert merged.counts == sketch.counts
+    assert merged.errors == sketch.errors
+    assert merged.total == sketch.total
+
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError):
+        SpaceSavingSketch(0)
+
+
+def test_add_heap_stays_bounded():
+    sketch = add_all(SpaceSavingSketch(20), make_stream(20000))
+    assert len(sketch._heap) <= 4 * sketch.capacity
+
+
+class CountingHeapq:
+    """Wraps heapq, counting calls per function."""
+
+    def __init__(self):
+        self.calls = Counter()
+
+    def __getattr__(self, name):
+        func = getattr(heapq, name)
+
+        def counted(*args, **kwargs):
+            self.calls[name] += 1
+            return func(*args, **kwargs)
+
+        return counted
+
+
+@pytest.mark.parametrize('capacity', [20, 2000])
+def test_add_uses_constant_heap_operations_per_item(monkeypatch, capacity):
+    counting = CountingHeapq()
+    monkeypatch.setattr(hashtag_analyzer, 'heapq', counting)
+    # No linear scan over the counters is allowed when evicting
+    monkeypatch.setattr(hashtag_analyzer, 'min', lambda *args, **kwargs: pytest.fail("min() scan"), raising=False)
+
+    stream = make_stream(20000)
+    add_all(SpaceSavingSketch(capacity), stream)
+
+    # One push per add, at most one successful pop per eviction plus one pop per
+    # outdated entry pushed earlier, so the amortized work is O(log capacity)
+    assert counting.calls['heappush'] == len(stream)
+    assert counting.calls['heappop'] <= len(stream)
+    # Each O(capacity) rebuild follows at least 3 * capacity pushes
+    assert counting.calls['heapify'] <= len(stream) // (3 * capacity) + 1
+
+
+def test_update_merges_bounded_batch_summaries(monkeypatch):
+    merges = []
+    combine_counters = hashtag_analyzer._combine_counters
+
+    def recording_combine(left, right, capacity):
+        merges.append((len(left[0]), len(right[0])))
+        return combine_counters(left, right, capacity)
+
+    monkeypatch.setattr(hashtag_analyzer, '_combine_counters', recording_combine)
+
+    stream = make_stream(50000)
+    SpaceSavingSketch(50).update(stream, batch_size=5000)
+
+    # One merge per batch, each over at most capacity counters per side, so
+    # per-batch Python work does not grow with the batch size
+    assert len(merges) == 10
+    assert all(left <= 50 and right <= 50 for left, right in merges)
+
+
+@pytest.mark.benchmark
+def test_update_not_slower_than_exact_counting():
+    rng = random.Random(1)
+    stream = [f"tag{rng.randrange(10 ** 7)}" for _ in range(100000)]
+    exact = best_time(lambda: Counter(stream).most_common(10))
+    sketch = best_time(lambda: SpaceSavingSketch(200).update(stream))
+    # Allow some slack for timing noise on shared machines
+    assert sketch <= exact * 1.5
+
+
+RECORDS = [
+    ('positive', 'Twitter', ['happy', 'tech'], ['alice']),
+    ('positive', 'Twitter', ['happy'], []),
+    ('negative', 'Twitter', ['angry'], ['support']),
+    ('positive', 'Instagram', ['happy', 'blessed'], ['bob']),
+    ('negative', 'Instagram', ['angry', 'tech'], ['support']),
+]
+
+
+def test_entity_sketches_grouped_by_sentiment_and_platform():
+    sketches = build_entity_sketches(RECORDS)
+    assert set(sketches) == {
+        ('positive', 'Twitter'), ('negative', 'Twitter'),
+        ('positive', 'Instagram'), ('negative', 'Instagram'),
+    }
+    assert sketches[('positive', 'Twitter')]['hashtags'].top(2) == [('happy', 2, 0), ('tech', 1, 0)]
+    assert sketches[('negative', 'Twitter')]['mentions'].top(1) == [('support', 1, 0)]
+
+
+def test_merged_chunk_sketches_match_single_pass():
+    merged = {}
+    for record in RECORDS:
+        merged = merge_entity_sketches(merged, build_entity_sketches([record]))
+    single = build_entity_sketches(RECORDS)
+
+    for entity in ['hashtags', 'mentions']:
+        assert get_top_entities(merged, entity).equals(get_top_entities(single, entity))
+
+
+def test_get_top_entities_filters_sentiments_and_platforms():
+    sketches = build_entity_sketches(RECORDS)
+
+    top = get_top_entities(sketches, 'hashtags')
+    assert top['Term'].tolist()[:2] == ['#happy', '#angry']
+    assert top['Count'].tolist()[:2] == [3, 2]
+
+    negative = get_top_entities(sketches, 'mentions', sentiments=['negative'])
+    assert negative.values.tolist() == [['@support', 2, 0]]
+
+    instagram = get_top_entities(sketches, 'hashtags', ['positive'], ['Instagram'])
+    assert instagram['Term'].tolist() == ['#blessed', '#happy']
+
+    assert get_top_entities(sketches, 'hashtags', platforms=['Facebook']).empty
+
+
+def test_get_top_entities_rejects_unknown_entity():
+    with pytest.raises(ValueError):
+        get_top_entities({}, 'emojis')
@@ -0,0 +1,336 @@
+import gc
+import os
+import threading
+
+import pandas as pd
+import pytest
+
+import memory_manager
+from memory_manager import (
+    MemoryGovernor,
+    SessionHandle,
+    SpilledFrameLostError,
+    estimate_frame_size,
+)
+
+
+def make_frame(rows=1000, seed=0):
+    return pd.DataFrame({
+        'id': range(seed, seed + rows),
+        'text': [f"post number {i}" for i in range(seed, seed + rows)],
+    })
+
+
+@pytest.fixture
+def frame_size():
+    return estimate_frame_size(make_frame())
+
+
+def make_governor(tmp_path, frame_size, session_frames=10, global_frames=100):
+    # Budgets expressed in frames, with some headroom for size differences
+    return MemoryGovernor(
+        session_budget=int(frame_size * (session_frames + 0.5)),
+        global_budget=int(frame_size * (global_frames + 0.5)),
+        spill_dir=str(tmp_path),
+    )
+
+
+def store_run(governor, session_id, name, frame):
+    """Store a frame in a script run of its own."""
+    governor.store(session_id, name, frame)
+    governor.unpin_session(session_id)
+
+
+def get_run(governor, session_id, name):
+    """Read a frame in a script run of its own."""
+    frame = governor.get(session_id, name)
+    governor.unpin_session(session_id)
+    return frame
+
+
+def resident_names(governor, session_id):
+    return sorted(
+        name for (sid, name), entry in governor._entries.items()
+        if sid == session_id and entry.resident
+    )
+
+
+def spill_files(governor):
+    return sorted(os.listdir(governor.spill_dir))
+
+
+def count_writes(monkeypatch):
+    writes = []
+    to_pickle = pd.DataFrame.to_pickle
+
+    def counting_to_pickle(self, *args, **kwargs):
+        writes.append(args[0])
+        return to_pickle(self, *args, **kwargs)
+
+    monkeypatch.setattr(pd.DataFrame, 'to_pickle', counting_to_pickle)
+    return writes
+
+
+def test_spills_least_recently_used_frame(tmp_path, frame_size):
+    governor = make_governor(tmp_path, frame_size, session_frames=2)
+    store_run(governor, 's1', 'a', make_frame(seed=0))
+    store_run(governor, 's1', 'b', make_frame(seed=1))
+    get_run(governor, 's1', 'a')
+    store_run(governor, 's1', 'c', make_frame(seed=2))
+
+    assert resident_names(governor, 's1') == ['a', 'c']
+    assert len(spill_files(governor)) == 1
+
+
+def test_reload_after_spill_returns_same_data(tmp_path, frame_size):
+    governor = make_governor(tmp_path, frame_size, session_frames=1)
+    original = make_frame(seed=0)
+    store_run(governor, 's1', 'a', original)
+    store_run(governor, 's1', 'b', make_frame(seed=1))
+    assert resident_names(governor, 's1') == ['b']
+
+    reloaded = get_run(governor, 's1', 'a')
+
+    pd.testing.assert_frame_equal(reloaded, original)
+    assert resident_names(governor, 's1') == ['a']
+    assert governor.get_usage()['reload_count'] == 1
+
+
+def test_frames_used_in_a_run_are_not_spilled(tmp_path, frame_size):
+    governor = make_governor(tmp_path, frame_size, session_frames=1)
+    governor.store('s1', 'a', make_frame(seed=0))
+    governor.store('s1', 'b', make_frame(seed=1))
+
+    # Both frames are held by the current run, so spilling frees nothing
+    assert resident_names(governor, 's1') == ['a', 'b']
+
+    governor.unpin_session('s1')
+
+    assert resident_names(governor, 's1') == ['b']
+
+
+def test_session_budget_only_spills_own_session(tmp_path, frame_size):
+    governor = make_governor(tmp_path, frame_size, session_frames=1)
+    store_run(governor, 's2', 'a', make_frame(seed=0))
+    store_run(governor, 's1', 'a', make_frame(seed=1))
+    store_run(governor, 's1', 'b', make_frame(seed=2))
+
+    assert resident_names(governor, 's1') == ['b']
+    assert resident_names(governor, 's2') == ['a']
+
+
+def test_global_budget_spills_across_sessions(tmp_path, frame_size):
+    governor = make_governor(tmp_path, frame_size, session_frames=10, global_frames=2)
+    store_run(governor, 's1', 'a', make_frame(seed=0))
+    store_run(governor, 's2', 'a', make_frame(seed=1))
+    store_run(governor, 's3', 'a', make_frame(seed=2))
+
+    assert resident_names(governor, 's1') == []
+    assert resident_names(governor, 's2') == ['a']
+    assert resident_names(governor, 's3') == ['a']
+    assert governor.get_usage()['resident_bytes'] <= governor.global_budget
+
+
+def test_global_budget_keeps_frames_pinned_by_other_sessions(tmp_path, frame_size):
+    governor = make_governor(tmp_path, frame_size, session_frames=10, global_frames=1)
+    governor.store('s1', 'a', make_frame(seed=0))
+    store_run(governor, 's2', 'a', make_frame(seed=1))
+
+    # s1 is still running, so its frame stays resident
+    assert resident_names(governor, 's1') == ['a']
+    assert resident_names(governor, 's2') == []
+
+
+def test_app_rerun_does_not_reload_frames_within_budget(tmp_path, frame_size):
+    governor = make_governor(tmp_path, frame_size, session_frames=1)
+    handle = SessionHandle(governor)
+
+    # First run loads the dataset; later runs only read it, as app.py does
+    handle.store('data', make_frame(seed=0))
+    handle.end_run()
+    for _ in range(3):
+        handle.end_run()
+        data = handle.get('data')
+        filtered = data[data['id'] % 2 == 0]
+        assert len(filtered) == 500
+        handle.end_run()
+
+    usage = governor.get_usage()
+    assert usage['reload_count'] == 0
+    assert usage['spill_count'] == 0
+
+
+def test_app_rerun_reloads_oversized_frame_once(tmp_path, frame_size, monkeypatch):
+    governor = MemoryGovernor(session_budget=frame_size // 2, spill_dir=str(tmp_path))
+    handle = SessionHandle(governor)
+    writes = count_writes(monkeypatch)
+
+    original = make_frame()
+    handle.store('data', original)
+    # Not spilled while the run that stored it is still using it
+    assert governor.get_usage()['spill_count'] == 0
+    handle.end_run()
+
+    for run in range(1, 4):
+        handle.end_run()
+        pd.testing.assert_frame_equal(handle.get('data'), original)
+        pd.testing.assert_frame_equal(handle.get('data'), original)
+        handle.end_run()
+        # The frame alone exceeds the budget, so it is read back once per run
+        # and spilled again between runs, reusing the same spill file
+        assert governor.get_usage()['reload_count'] == run
+        assert resident_names(governor, handle.session_id) == []
+
+    assert len(writes) == 1
+
+
+def test_release_session_removes_spill_files(tmp_path, frame_size):
+    governor = make_governor(tmp_path, frame_size, session_frames=1)
+    store_run(governor, 's1', 'a', make_frame(seed=0))
+    store_run(governor, 's1', 'b', make_frame(seed=1))
+    store_run(governor, 's2', 'a', make_frame(seed=2))
+    store_run(governor, 's2', 'b', make_frame(seed=3))
+    assert len(spill_files(governor)) == 2
+
+    governor.release_session('s1')
+
+    assert len(spill_files(governor)) == 1
+    assert governor.get('s1', 'a') is None
+    assert 's1' not in governor.get_usage()['sessions']
+
+
+def test_store_replaces_previous_frame_and_spill_file(tmp_path, frame_size):
+    governor = make_governor(tmp_path, frame_size, session_frames=1)
+    store_run(governor, 's1', 'a', make_frame(seed=0))
+    store_run(governor, 's1', 'b', make_frame(seed=1))
+    assert len(spill_files(governor)) == 1
+
+    replacement = make_frame(seed=5)
+    store_run(governor, 's1', 'a', replacement)
+
+    assert spill_files(governor) != []
+    pd.testing.assert_frame_equal(get_run(governor, 's1', 'a'), replacement)
+    assert governor.get_usage()['sessions']['s1']['frames'] == 2
+
+
+def test_session_handle_releases_frames_when_collected(tmp_path, frame_size):
+    governor = make_governor(tmp_path, frame_size, session_frames=1)
+    handle = SessionHandle(governor)
+    handle.store('a', make_frame(seed=0))
+    handle.store('b', make_frame(seed=1))
+    handle.end_run()
+    session_id = handle.session_id
+    assert len(spill_files(governor)) == 1
+
+    del handle
+    gc.collect()
+
+    assert session_id not in governor.get_usage()['sessions']
+    assert spill_files(governor) == []
+
+
+def test_spill_write_does_not_block_other_sessions(tmp_path, frame_size, monkeypatch):
+    governor = make_governor(tmp_path, frame_size, session_frames=1)
+    store_run(governor, 's2', 'a', make_frame(seed=9))
+    write_started = threading.Event()
+    release_write = threading.Event()
+    to_pickle = pd.DataFrame.to_pickle
+
+    def slow_to_pickle(self, *args, **kwargs):
+        write_started.set()
+        release_write.wait(5)
+        return to_pickle(self, *args, **kwargs)
+
+    monkeypatch.setattr(pd.DataFrame, 'to_pickle', slow_to_pickle)
+
+    original = make_frame(seed=0)
+    store_run(governor, 's1', 'a', original)
+    writer = threading.Thread(target=store_run, args=(governor, 's1', 'b', make_frame(seed=1)))
+    writer.start()
+    assert write_started.wait(5)
+
+    # While s1's spill is being written, other sessions still go through
+    results = {}
+    reader = threading.Thread(target=lambda: results.update(
+        usage=governor.get_usage(),
+        other=get_run(governor, 's2', 'a'),
+    ))
+    reader.start()
+    reader.join(2)
+    alive = reader.is_alive()
+    release_write.set()
+    writer.join(5)
+    reader.join(5)
+
+    assert not alive
+    assert results['usage']['sessions']['s1']['frames'] == 2
+    pd.testing.assert_frame_equal(results['other'], make_frame(seed=9))
+    pd.testing.assert_frame_equal(governor.get('s1', 'a'), original)
+
+
+def test_frame_being_spilled_is_served_from_memory(tmp_path, frame_size, monkeypatch):
+    governor = make_governor(tmp_path, frame_size, session_frames=1)
+    original = make_frame(seed=0)
+    store_run(governor, 's1', 'a', original)
+    store_run(governor, 's1', 'b', make_frame(seed=1))
+
+    # Simulate a spill write of 'a' that has not finished yet
+    entry = governor._entries[('s1', 'a')]
+    entry.writing_frame = original
+    monkeypatch.setattr(pd, 'read_pickle', lambda *args, **kwargs: pytest.fail("read from disk"))
+
+    assert governor.get('s1', 'a') is original
+
+
+def test_missing_spill_file_drops_entry(tmp_path, frame_size):
+    governor = make_governor(tmp_path, frame_size, session_frames=1)
+    store_run(governor, 's1', 'a', make_frame(seed=0))
+    store_run(governor, 's1', 'b', make_frame(seed=1))
+    for name in spill_files(governor):
+        os.remove(os.path.join(governor.spill_dir, name))
+
+    with pytest.raises(SpilledFrameLostError):
+        governor.get('s1', 'a')
+
+    assert governor.get('s1', 'a') is None
+    assert governor.get_usage()['sessions']['s1']['frames'] == 1
+
+
+def test_cleanup_removes_spill_directory(tmp_path, frame_size):
+    spill_dir = tmp_path / 'spill'
+    governor = make_governor(spill_dir, frame_size, session_frames=1)
+    store_run(governor, 's1', 'a', make_frame(seed=0))
+    store_run(governor, 's1', 'b', make_frame(seed=1))
+    assert spill_files(governor)
+
+    governor.cleanup()
+
+    assert not spill_dir.exists()
+    assert governor.get_usage()['sessions'] == {}
+
+
+def test_shared_governor_cleanup_registered_at_exit(monkeypatch):
+    registered = []
+    monkeypatch.setattr(memory_manager, '_governor', None)
+    monkeypatch.setattr(memory_manager.atexit, 'register', registered.append)
+
+    governor = memory_manager.get_governor()
+
+    assert memory_manager.get_governor() is governor
+    assert registered == [governor.cleanup]
+    governor.cleanup()
+
+
+@pytest.mark.parametrize('value, expected', [
+    (None, 100),
+    ('2048', 2048),
+    ('lots', 100),
+    ('0', 100),
+    ('-5', 100),
+])
+def test_budget_from_env(monkeypatch, value, expected):
+    if value is None:
+        monkeypatch.delenv('TEST_MEMORY_BUDGET', raising=False)
+    else:
+        monkeypatch.setenv('TEST_MEMORY_BUDGET', value)
+    assert memory_manager.budget_from_env('TEST_MEMORY_BUDGET', 100) == expected
@@ -0,0 +1,155 @@
+import importlib
+import sys
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+nltk = pytest.importorskip("nltk")
+pytest.importorskip("textblob")
+vader = pytest.importorskip("nltk.sentiment.vader")
+
+
+class StubIntensityAnalyzer:
+    """Deterministic stand-in for VADER, so no lexicon download is needed."""
+
+    def polarity_scores(self, text):
+        words = text.lower().split()
+        if "love" in words:
+            return {'compound': 0.8, 'pos': 0.6, 'neu': 0.4, 'neg': 0.0}
+        if "hate" in words:
+            return {'compound': -0.8, 'pos': 0.0, 'neu': 0.4, 'neg': 0.6}
+        return {'compound': 0.0, 'pos': 0.0, 'neu': 1.0, 'neg': 0.0}
+
+
+@pytest.fixture(scope="module")
+def sa():
+    patch = pytest.MonkeyPatch()
+    patch.setattr(nltk, "download", lambda *args, **kwargs: None)
+    patch.setattr(vader, "SentimentIntensityAnalyzer", StubIntensityAnalyzer)
+    sys.modules.pop("sentiment_analyzer", None)
+    module = importlib.import_module("sentiment_analyzer")
+    yield module
+    patch.undo()
+    sys.modules.pop("sentiment_analyzer", None)
+
+
+POSTS = [
+    ("I love this #Happy #tech @Alice", "twitter"),
+    ("I hate waiting #angry @support", "twitter"),
+    ("love it #happy", "instagram"),
+    ("Contact a@b.com about issue#123 #tech", "twitter"),
+    ("hate hate #angry #tech @Support", "instagram"),
+    ("", "twitter"),
+    ("love the update #happy @alice https://example.com/#anchor", "twitter"),
+]
+
+
+def make_frame(with_platform=True):
+    data = {'text': [text for text, _ in POSTS]}
+    if with_platform:
+        data['platform'] = [platform for _, platform in POSTS]
+    return pd.DataFrame(data)
+
+
+def exact_entity_counts(sa, df, platforms):
+    """Count entities per (sentiment, platform) exactly, post by post."""
+    counts = {}
+    for text, sentiment, platform in zip(df['text'], df['sentiment'], platforms):
+        _, hashtags, mentions = sa.clean_text_with_entities(text)
+        entity_counts = counts.setdefault((sentiment, platform), {
+            'hashtags': Counter(), 'mentions': Counter(),
+        })
+        entity_counts['hashtags'].update(hashtags)
+        entity_counts['mentions'].update(mentions)
+    return counts
+
+
+def test_clean_text_with_entities_extracts_markers(sa):
+    text, hashtags, mentions = sa.clean_text_with_entities(
+        "Hey @Bob, loving #Summer (#fun)! see https://x.com/#anchor"
+    )
+    assert text == "Hey , loving Summer (fun)! see"
+    assert hashtags == ['summer', 'fun']
+    assert mentions == ['bob']
+
+
+def test_clean_text_with_entities_ignores_markers_inside_words(sa):
+    text, hashtags, mentions = sa.clean_text_with_entities("mail a@b.com about issue#123")
+    assert text == "mail a@b.com about issue#123"
+    assert hashtags == []
+    assert mentions == []
+
+
+def test_clean_text_matches_entity_cleaning(sa):
+    text = "Great @team work #Launch"
+    assert sa.clean_text(text) == sa.clean_text_with_entities(text)[0] == "Great work Launch"
+
+
+def test_analyze_text_returns_original_tuple(sa):
+    result = sa.analyze_text("I love this #happy")
+    assert len(result) == 3
+    sentiment, components, score = result
+    assert sentiment == "positive"
+    assert components == (0.6, 0.4, 0.0)
+    assert score > 0
+
+    assert sa.analyze_text("   ") == ("neutral", (0.0, 0.0, 0.0), 0.0)
+
+
+def test_analyze_dataframe_without_sketches(sa):
+    df = sa.analyze_dataframe(make_frame(), 'text')
+    assert df['sentiment'].tolist() == [
+        'positive', 'negative', 'positive', 'neutral', 'negative', 'neutral', 'positive',
+    ]
+    assert 'hashtags' not in df.columns
+    assert 'mentions' not in df.columns
+
+
+def test_analyze_dataframe_sketches_across_chunk_boundary(sa, monkeypatch):
+    flushed = []
+    build_entity_sketches = sa.build_entity_sketches
+
+    def recording_build(records, *args, **kwargs):
+        records = list(records)
+        flushed.append(len(records))
+        return build_entity_sketches(records, *args, **kwargs)
+
+    monkeypatch.setattr(sa, "DEFAULT_CHUNK_SIZE", 3)
+    monkeypatch.setattr(sa, "build_entity_sketches", recording_build)
+
+    sketches = {}
+    df = sa.analyze_dataframe(make_frame(), 'text', sketches)
+
+    # Two full chunks and a final partial one
+    assert flushed == [3, 3, 1]
+
+    exact = exact_entity_counts(sa, df, df['platform'])
+    assert set(sketches) == set(exact)
+    for key, entity_counts in exact.items():
+        for entity, counts in entity_counts.items():
+            sketch = sketches[key][entity]
+            assert sketch.counts == dict(counts)
+            assert sketch.total == sum(counts.values())
+            assert set(sketch.errors.values()) <= {0}
+
+    assert sketches[('positive', 'twitter')]['hashtags'].top(2) == [('happy', 2, 0), ('tech', 1, 0)]
+    assert sketches[('negative', 'instagram')]['mentions'].top(1) == [('support', 1, 0)]
+
+
+def test_analyze_dataframe_without_platform_column(sa, monkeypatch):
+    monkeypatch.setattr(sa, "DEFAULT_CHUNK_SIZE", 4)
+
+    sketches = {}
+    df = sa.analyze_dataframe(make_frame(with_platform=False), 'text', sketches)
+
+    assert {platform for _, platform in sketches} == {'unknown'}
+    exact = exact_entity_counts(sa, df, ['unknown'] * len(df))
+    for key, entity_counts in exact.items():
+        for entity, counts in entity_counts.items():
+            assert sketches[key][entity].counts == dict(counts)
+
+
+def test_analyze_dataframe_requires_text_column(sa):
+    with pytest.raises(ValueError):
+        sa.analyze_dataframe(make_frame(), 'caption')